@@ -32,7 +32,8 @@ def apriori(
     Parameters
     ----------
     transactions : list of transactions (sets/tuples/lists). Each element in
-        the transactions must be hashable.
+        the transactions must be hashable. The transactions are iterated over
+        once, so any iterable, such as a generator, may be used.
     min_support : float
         The minimum support of the rules returned. The support is frequency of
         which the items in the rule appear together in the data set.
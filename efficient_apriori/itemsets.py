@@ -5,11 +5,11 @@ Implementations of algorithms related to itemsets.
 """
 
 import itertools
+import math
 import numbers
 import typing
 import collections
 from dataclasses import field, dataclass
-import collections.abc
 
 
 @dataclass
@@ -18,23 +18,115 @@ class ItemsetCount:
     members: set = field(default_factory=set)
 
 
+def _popcount_fallback(bits: int) -> int:
+    """Return the number of set bits in a non-negative integer."""
+    return bin(bits).count("1")
+
+
+# Counting the set bits is done in C by `int.bit_count` on Python 3.10+
+_popcount: typing.Callable[[int], int] = getattr(int, "bit_count", _popcount_fallback)
+
+
+def _bits_from_indices(indices: typing.Iterable[int], num_bits: int) -> int:
+    """Pack indices into an integer bitmask, with bit i set for every index i."""
+    buffer = bytearray((num_bits >> 3) + 1)
+    for i in indices:
+        buffer[i >> 3] |= 1 << (i & 7)
+    return int.from_bytes(buffer, "little")
+
+
+# Translates the binary digits "0" and "1" to the bytes 0 and 1
+_BINARY_TO_FLAGS = bytes.maketrans(b"01", b"\x00\x01")
+
+
+def _indices_from_bits(bits: int, ids: typing.Sequence[int]) -> typing.Set[int]:
+    """Unpack an integer bitmask into the set of indices of the set bits.
+
+    The indices are selected from `ids`, where ids[i] == i, so that every set
+    returned refers to the same int objects instead of creating new ones.
+    """
+    # The reversed binary string has the least significant bit first
+    binary = bin(bits)[:1:-1]
+
+    # If many bits are set, select the indices of all of them in C
+    if _popcount(bits) * 8 > len(binary):
+        flags = binary.encode("ascii").translate(_BINARY_TO_FLAGS)
+        return set(itertools.compress(ids, flags))
+
+    # If few bits are set, jump from one set bit to the next
+    indices = set()
+    i = binary.find("1")
+    while i != -1:
+        indices.add(ids[i])
+        i = binary.find("1", i + 1)
+    return indices
+
+
+def _itemset_counts(
+    itemsets: typing.Dict[tuple, int], itemset_bits: typing.Dict[tuple, int], ids: typing.Sequence[int]
+) -> typing.Dict[tuple, ItemsetCount]:
+    """Pair the count of every itemset with the ids of its transactions."""
+    return {
+        itemset: ItemsetCount(itemset_count=count, members=_indices_from_bits(itemset_bits[itemset], ids))
+        for (itemset, count) in itemsets.items()
+    }
+
+
+def _min_count(min_support: float, num_transactions: int) -> int:
+    """
+    Return the smallest count such that count / num_transactions >= min_support.
+
+    Comparing counts to this integer threshold gives the same result as
+    dividing every count by the number of transactions, floating point
+    rounding included.
+
+    Examples
+    --------
+    >>> _min_count(0.5, 10)
+    5
+    >>> _min_count(0.07, 100)  # 0.07 * 100 evaluates to 7.000000000000001
+    7
+    """
+    min_count = math.ceil(min_support * num_transactions)
+    while min_count > 0 and (min_count - 1) / num_transactions >= min_support:
+        min_count -= 1
+    while min_count / num_transactions < min_support:
+        min_count += 1
+    return min_count
+
+
 class TransactionManager:
     # The brilliant transaction manager idea is due to:
     # https://github.com/ymoch/apyori/blob/master/apyori.py
 
     def __init__(self, transactions: typing.Iterable[typing.Iterable[typing.Hashable]]):
-        # A lookup that returns indices of transactions for each item
-        self.indices_by_item = collections.defaultdict(set)
+        # A lookup that returns the sorted indices of transactions for each item
+        indices_by_item: typing.DefaultDict[typing.Hashable, typing.List[int]] = collections.defaultdict(list)
 
-        # Populate
+        # Populate, skipping items repeated within a transaction
         i = -1
         for i, transaction in enumerate(transactions):
             for item in transaction:
-                self.indices_by_item[item].add(i)
+                indices = indices_by_item[item]
+                if not indices or indices[-1] != i:
+                    indices.append(i)
+
+        self.indices_by_item: typing.Dict[typing.Hashable, typing.List[int]] = dict(indices_by_item)
 
         # Total number of transactions
         self._transactions = i + 1
 
+        # A lookup that returns a bitmask for each item, where bit i is set if
+        # the item is in transaction i. Intersecting the transactions of
+        # several items is then a single bitwise AND on Python integers.
+        # The bitmasks are built on demand, since infrequent items never
+        # take part in an intersection
+        self._bits_by_item: typing.Dict[typing.Hashable, int] = dict()
+
+        # The transaction ids 0, 1, 2, ..., built on demand. Sets of indices
+        # are selected from this list, so they share the int objects
+        self._ids: typing.List[int] = []
+
     @property
     def items(self):
         return set(self.indices_by_item.keys())
@@ -42,46 +134,81 @@ class TransactionManager:
     def __len__(self):
         return self._transactions
 
+    def item_count(self, item: typing.Hashable) -> int:
+        """Return the number of transactions containing the item."""
+        return len(self.indices_by_item.get(item, ()))
+
+    def item_bits(self, item: typing.Hashable) -> int:
+        """Return the bitmask of the transactions containing the item."""
+        try:
+            return self._bits_by_item[item]
+        except KeyError:
+            bits = _bits_from_indices(self.indices_by_item.get(item, ()), self._transactions)
+            self._bits_by_item[item] = bits
+            return bits
+
+    def transaction_ids(self) -> typing.List[int]:
+        """Return the list of transaction ids, shared by all sets of indices."""
+        if len(self._ids) != self._transactions:
+            self._ids = list(range(self._transactions))
+        return self._ids
+
+    # The methods below look up the transactions of a single itemset. They are
+    # not used by `itemsets_from_transactions`, which counts every candidate
+    # by intersecting the bitmask of its prefix with the bitmask of one item
+
     def transaction_indices(self, transaction: typing.Iterable[typing.Hashable]):
         """Return the indices of the transaction."""
 
         transaction = set(transaction)  # Copy
         item = transaction.pop()
-        indices = self.indices_by_item[item]
+        bits = self.item_bits(item)
         while transaction:
             item = transaction.pop()
-            indices = indices.intersection(self.indices_by_item[item])
-        return indices
+            bits &= self.item_bits(item)
+        return _indices_from_bits(bits, self.transaction_ids())
 
-    def transaction_indices_sc(self, transaction: typing.Iterable[typing.Hashable], min_support: float = 0):
-        """Return the indices of the transaction, with short-circuiting.
+    def transaction_bits_sc(self, transaction: typing.Iterable[typing.Hashable], min_support: float = 0):
+        """Return the bitmask of the transaction, with short-circuiting.
 
-        Returns (over_or_equal_to_min_support, set_of_indices)
+        Returns (over_or_equal_to_min_support, bitmask_of_indices)
         """
 
         # Sort items by number of transaction rows the item appears in,
         # starting with the item beloning to the most transactions
-        transaction = sorted(transaction, key=lambda item: len(self.indices_by_item[item]), reverse=True)
+        transaction = sorted(transaction, key=self.item_count, reverse=True)
+
+        # Compare counts to an integer threshold, instead of dividing every
+        # count by the number of transactions
+        min_count = _min_count(min_support, len(self))
 
         # Pop item appearing in the fewest
         item = transaction.pop()
-        indices = self.indices_by_item[item]
-        support = len(indices) / len(self)
-        if support < min_support:
+        if self.item_count(item) < min_count:
             return False, None
+        bits = self.item_bits(item)
 
         # The support is a non-increasing function
         # Sorting by number of transactions the items appear in is a heuristic
         # to make the support drop as quickly as possible
         while transaction:
             item = transaction.pop()
-            indices = indices.intersection(self.indices_by_item[item])
-            support = len(indices) / len(self)
-            if support < min_support:
+            bits &= self.item_bits(item)
+            if _popcount(bits) < min_count:
                 return False, None
 
         # No short circuit happened
-        return True, indices
+        return True, bits
+
+    def transaction_indices_sc(self, transaction: typing.Iterable[typing.Hashable], min_support: float = 0):
+        """Return the indices of the transaction, with short-circuiting.
+
+        Returns (over_or_equal_to_min_support, set_of_indices)
+        """
+        over_min_support, bits = self.transaction_bits_sc(transaction, min_support=min_support)
+        if not over_min_support:
+            return False, None
+        return True, _indices_from_bits(bits, self.transaction_ids())
 
 
 def join_step(itemsets: typing.List[tuple]):
@@ -106,47 +233,19 @@ def join_step(itemsets: typing.List[tuple]):
     >>> list(join_step(itemsets))
     [(1, 2, 3, 4), (1, 3, 4, 5)]
     """
-    i = 0
-    # Iterate over every itemset in the itemsets
-    while i < len(itemsets):
-        # The number of rows to skip in the while-loop, initially set to 1
-        skip = 1
-
-        # Get all but the last item in the itemset, and the last item
-        *itemset_first, itemset_last = itemsets[i]
-
-        # We now iterate over every itemset following this one, stopping
-        # if the first k - 1 items are not equal. If we're at (1, 2, 3),
-        # we'll consider (1, 2, 4) and (1, 2, 7), but not (1, 3, 1)
-
+    # Group the itemsets by all but the last item. The itemsets are sorted, so
+    # the itemsets with equal first k - 1 items are consecutive. If we're at
+    # (1, 2, 3), we'll consider (1, 2, 4) and (1, 2, 7), but not (1, 3, 1)
+    for itemset_first, group in itertools.groupby(itemsets, key=lambda itemset: itemset[:-1]):
         # Keep a list of all last elements, i.e. tail elements, to perform
-        # 2-combinations on later on
-        tail_items = [itemset_last]
-        tail_items_append = tail_items.append  # Micro-optimization
-
-        # Iterate over ever itemset following this itemset
-        for j in range(i + 1, len(itemsets)):
-            # Get all but the last item in the itemset, and the last item
-            *itemset_n_first, itemset_n_last = itemsets[j]
-
-            # If it's the same, append and skip this itemset in while-loop
-            if itemset_first == itemset_n_first:
-                # Micro-optimization
-                tail_items_append(itemset_n_last)
-                skip += 1
-
-            # If it's not the same, break out of the for-loop
-            else:
-                break
+        # 2-combinations on
+        tail_items = [itemset[-1] for itemset in group]
 
         # For every 2-combination in the tail items, yield a new candidate
-        # itemset, which is sorted.
-        itemset_first_tuple = tuple(itemset_first)
+        # itemset, which is sorted. The tail items are sorted since the
+        # itemsets are, so the 2-combinations are yielded in sorted order.
         for a, b in itertools.combinations(tail_items, 2):
-            yield itemset_first_tuple + (a,) + (b,)
-
-        # Increment the while-loop counter
-        i += skip
+            yield itemset_first + (a, b)
 
 
 def prune_step(itemsets: typing.Iterable[tuple], possible_itemsets: typing.List[tuple]):
@@ -177,11 +276,11 @@ def prune_step(itemsets: typing.Iterable[tuple], possible_itemsets: typing.List[
         # Remove 1 from the combination, same as k-1 combinations
         # The itemsets created by removing the last two items in the possible
         # itemsets must be part of the itemsets by definition,
-        # due to the way the `join_step` function merges the sorted itemsets
-
-        for i in range(len(possible_itemset) - 2):
-            removed = possible_itemset[:i] + possible_itemset[i + 1 :]
+        # due to the way the `join_step` function merges the sorted itemsets.
+        # These are the first two k-1 combinations, and are skipped
 
+        combinations = itertools.combinations(possible_itemset, len(possible_itemset) - 1)
+        for removed in itertools.islice(combinations, 2, None):
             # If every k combination exists in the set of itemsets,
             # yield the possible itemset. If it does not exist, then it's
             # support cannot be large enough, since supp(A) >= supp(AB) for
@@ -236,6 +335,8 @@ def itemsets_from_transactions(
     Parameters
     ----------
     transactions : a list of itemsets (tuples/sets/lists with hashable entries)
+        The transactions are iterated over once, so any iterable, such as a
+        generator, may be used.
     min_support : float
         The minimum support of the itemsets, i.e. the minimum frequency as a
         percentage.
@@ -280,9 +381,11 @@ def itemsets_from_transactions(
         print("Generating itemsets.")
         print(" Counting itemsets of length 1.")
 
-    candidates: typing.Dict[tuple, int] = {(item,): len(indices) for item, indices in manager.indices_by_item.items()}
+    # Compare counts to an integer threshold instead of dividing every count
+    min_count = _min_count(min_support, transaction_count)
+
     large_itemsets: typing.Dict[int, typing.Dict[tuple, int]] = {
-        1: {item: count for (item, count) in candidates.items() if (count / len(manager)) >= min_support}
+        1: {(item,): len(indices) for (item, indices) in manager.indices_by_item.items() if len(indices) >= min_count}
     }
 
     if verbosity > 0:
@@ -298,6 +401,24 @@ def itemsets_from_transactions(
     # STEP 2 - Build up the size of the itemsets
     # ------------------------------------------
 
+    # Only the frequent items can be part of a large itemset, so bitmasks of
+    # transactions are only built for these items, once
+    bits_by_item: typing.Dict[typing.Hashable, int] = {
+        item: manager.item_bits(item) for (item,) in large_itemsets[1].keys()
+    }
+
+    # The transactions containing each large itemset of the previous size, as
+    # bitmasks. Every candidate joins a large itemset of the previous size with
+    # a single item, so its bitmask is a single bitwise AND away
+    itemset_bits: typing.Dict[tuple, int] = {(item,): bits for (item, bits) in bits_by_item.items()}
+
+    # If transaction ids are output, the bitmasks of the large itemsets are
+    # unpacked to ids as soon as each size is found. Only the bitmasks of the
+    # latest size are kept, for counting the next size
+    if output_transaction_ids:
+        ids = manager.transaction_ids()
+        itemsets_out = {1: _itemset_counts(large_itemsets[1], itemset_bits, ids)}
+
     # While there are itemsets of the previous size
     k = 2
     while large_itemsets[k - 1] and (max_length != 1):
@@ -307,22 +428,30 @@ def itemsets_from_transactions(
         # STEP 2a) - Build up candidate of larger itemsets
 
         # Retrieve the itemsets of the previous size, i.e. of size k - 1
-        # They must be sorted to maintain the invariant when joining/pruning
-        itemsets_list = sorted(item for item in large_itemsets[k - 1].keys())
+        # They must be sorted to maintain the invariant when joining/pruning.
+        # Candidates are generated in sorted order, so only the itemsets of
+        # size 1 are not already sorted
+        if k == 2:
+            itemsets_list = sorted(large_itemsets[k - 1].keys())
+        else:
+            itemsets_list = list(large_itemsets[k - 1].keys())
 
-        # Gen candidates of length k + 1 by joining, prune, and copy as set
+        # Gen candidates of length k + 1 by joining and pruning
         # This algorithm assumes that the list of itemsets are sorted,
-        # and that the itemsets themselves are sorted tuples
-        C_k: typing.List[tuple] = list(apriori_gen(itemsets_list))
+        # and that the itemsets themselves are sorted tuples. The candidates
+        # are counted as they are generated, and only stored in a list if
+        # they are to be printed
+        C_k: typing.Iterable[tuple] = apriori_gen(itemsets_list)
 
         if verbosity > 0:
+            C_k = list(C_k)
             print("  Found {} candidate itemsets of length {}.".format(len(C_k), k))
-        if verbosity > 1:
-            print("   {}".format(C_k))
+            if verbosity > 1:
+                print("   {}".format(C_k))
 
-        # If no candidate itemsets were found, break out of the loop
-        if not C_k:
-            break
+            # If no candidate itemsets were found, break out of the loop
+            if not C_k:
+                break
 
         # Prepare counts of candidate itemsets (from the prune step)
         if verbosity > 1:
@@ -330,17 +459,24 @@ def itemsets_from_transactions(
 
         # Keep only large transactions
         found_itemsets: typing.Dict[tuple, int] = dict()
+        found_itemset_bits: typing.Dict[tuple, int] = dict()
         for candidate in C_k:
-            over_min_support, indices = manager.transaction_indices_sc(candidate, min_support=min_support)
-            if over_min_support:
-                found_itemsets[candidate] = len(indices)
+            # The prefix candidate[:-1] is a large itemset by the join step
+            bits = itemset_bits[candidate[:-1]] & bits_by_item[candidate[-1]]
+            count = _popcount(bits)
+            if count >= min_count:
+                found_itemsets[candidate] = count
+                found_itemset_bits[candidate] = bits
+        itemset_bits = found_itemset_bits
 
         # If no itemsets were found, break out of the loop
         if not found_itemsets:
             break
 
         # Candidate itemsets were found, add them
-        large_itemsets[k] = {i: counts for (i, counts) in found_itemsets.items()}
+        large_itemsets[k] = found_itemsets
+        if output_transaction_ids:
+            itemsets_out[k] = _itemset_counts(found_itemsets, found_itemset_bits, ids)
 
         if verbosity > 0:
             num_found = len(large_itemsets[k])
@@ -357,13 +493,6 @@ def itemsets_from_transactions(
         print("Itemset generation terminated.\n")
 
     if output_transaction_ids:
-        itemsets_out = {
-            length: {
-                item: ItemsetCount(itemset_count=count, members=manager.transaction_indices(set(item)))
-                for (item, count) in itemsets.items()
-            }
-            for (length, itemsets) in large_itemsets.items()
-        }
         return itemsets_out, len(manager)
 
     return large_itemsets, len(manager)
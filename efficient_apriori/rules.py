@@ -6,7 +6,6 @@ Implementations of algorithms related to association rules.
 
 import typing
 import numbers
-import itertools
 from efficient_apriori.itemsets import apriori_gen
 
 
@@ -15,6 +14,9 @@ class Rule:
     A class for a rule.
     """
 
+    # Many rules may be generated, so there is no per-instance __dict__
+    __slots__ = ("lhs", "rhs", "count_full", "count_lhs", "count_rhs", "num_transactions")
+
     # Number of decimals used for printing
     _decimals = 3
 
@@ -74,12 +76,9 @@ class Rule:
         The confidence of a rule is the probability of the rhs given the lhs.
         If X -> Y, then the confidence is P(Y|X).
         """
-        try:
-            return self.count_full / self.count_lhs
-        except ZeroDivisionError:
-            return None
-        except AttributeError:
+        if not self.count_lhs:
             return None
+        return self.count_full / self.count_lhs
 
     @property
     def support(self):
@@ -87,12 +86,9 @@ class Rule:
         The support of a rule is the frequency of which the lhs and rhs appear
         together in the dataset. If X -> Y, then the support is P(Y and X).
         """
-        try:
-            return self.count_full / self.num_transactions
-        except ZeroDivisionError:
-            return None
-        except AttributeError:
+        if not self.num_transactions:
             return None
+        return self.count_full / self.num_transactions
 
     @property
     def lift(self):
@@ -101,15 +97,12 @@ class Rule:
         support if the lhs and rhs were independent.If X -> Y, then the lift is
         given by the fraction P(X and Y) / (P(X) * P(Y)).
         """
-        try:
-            observed_support = self.count_full / self.num_transactions
-            prod_counts = self.count_lhs * self.count_rhs
-            expected_support = prod_counts / self.num_transactions**2
-            return observed_support / expected_support
-        except ZeroDivisionError:
-            return None
-        except AttributeError:
+        prod_counts = self.count_lhs * self.count_rhs
+        if not self.num_transactions or not prod_counts:
             return None
+        observed_support = self.count_full / self.num_transactions
+        expected_support = prod_counts / self.num_transactions**2
+        return observed_support / expected_support
 
     @property
     def conviction(self):
@@ -119,27 +112,23 @@ class Rule:
         often Y does not appear in the data, given X. If the ratio is large,
         then the confidence is large and Y appears often.
         """
-        try:
-            eps = 10e-10  # Avoid zero division
-            prob_not_rhs = 1 - self.count_rhs / self.num_transactions
-            prob_not_rhs_given_lhs = 1 - self.confidence
-            return prob_not_rhs / (prob_not_rhs_given_lhs + eps)
-        except ZeroDivisionError:
-            return None
-        except AttributeError:
+        confidence = self.confidence
+        if not self.num_transactions or confidence is None:
             return None
+        eps = 10e-10  # Avoid zero division
+        prob_not_rhs = 1 - self.count_rhs / self.num_transactions
+        prob_not_rhs_given_lhs = 1 - confidence
+        return prob_not_rhs / (prob_not_rhs_given_lhs + eps)
 
     @property
     def rpf(self):
         """
         The RPF (Rule Power Factor) is the confidence times the support.
         """
-        try:
-            return self.confidence * self.support
-        except ZeroDivisionError:
-            return None
-        except AttributeError:
+        confidence, support = self.confidence, self.support
+        if confidence is None or support is None:
             return None
+        return confidence * support
 
     @staticmethod
     def _pf(s):
@@ -193,8 +182,7 @@ def generate_rules_simple(
     DO NOT USE. This is a simple top-down algorithm for generating association
     rules. It is included here for testing purposes, and because it is
     mentioned in the 1994 paper by Agrawal et al. It is slow because it does
-    not enumerate the search space efficiently: it produces duplicates, and it
-    does not prune the search space efficiently.
+    not prune the search space efficiently.
 
     Simple algorithm for generating association rules from itemsets.
     """
@@ -205,21 +193,11 @@ def generate_rules_simple(
         if size < 2:
             continue
 
-        # This algorithm returns duplicates, so we keep track of items yielded
-        # in a set to avoid yielding duplicates
-        yielded: set = set()
-        yielded_add = yielded.add
-
         # Iterate over every itemset of the prescribed size
         for itemset in itemsets[size].keys():
-            # Generate rules
-            for result in _genrules(itemset, itemset, itemsets, min_confidence, num_transactions):
-                # If the rule has been yieded, keep going, else add and yield
-                if result in yielded:
-                    continue
-
-                yielded_add(result)
-                yield result
+            # Generate rules. Every left hand side is visited once, so no
+            # duplicates are produced
+            yield from _genrules(itemset, itemset, itemsets, min_confidence, num_transactions)
 
 
 def _genrules(l_k, a_m, itemsets, min_conf, num_transactions):
@@ -238,33 +216,48 @@ def _genrules(l_k, a_m, itemsets, min_conf, num_transactions):
         l_k. The itemset a_m is a subset of l_k.
     """
 
-    def count(itemset):
-        """
-        Helper function to retrieve the count of the itemset in the dataset.
-        """
-        return itemsets[len(itemset)][itemset]
-
-    # Iterate over every k - 1 combination of a_m to produce
-    # rules of the form a -> (l - a)
-    for a_m in itertools.combinations(a_m, len(a_m) - 1):
-        # Compute the count of this rule, which is a_m -> (l_k - a_m)
-        confidence = count(l_k) / count(a_m)
-
-        # Keep going if the confidence level is too low
-        if confidence < min_conf:
-            continue
+    # The count of l_k is the same for every rule
+    count_l_k = itemsets[len(l_k)][l_k]
+
+    # Search the left hand sides depth first, using a stack instead of
+    # recursion. Each entry is a left hand side a_m and the index `start`:
+    # only items at this index in a_m or later are removed. Items are removed
+    # from l_k in increasing order, so that every left hand side is reached by
+    # exactly one sequence of removals
+    stack = [(a_m, 0)]
+    while stack:
+        a_m, start = stack.pop()
+
+        # Every left hand side has length len(a_m) - 1, and every right hand
+        # side the remaining items of l_k, so the counts are found in two dicts
+        itemsets_lhs = itemsets[len(a_m) - 1]
+        itemsets_rhs = itemsets[len(l_k) - len(a_m) + 1]
+
+        # Iterate over every k - 1 combination of a_m to produce rules of the
+        # form a -> (l - a), removing only items at or after the index `start`
+        for i in range(start, len(a_m)):
+            lhs = a_m[:i] + a_m[i + 1 :]
+
+            # Compute the count of this rule, which is lhs -> (l_k - lhs)
+            count_lhs = itemsets_lhs[lhs]
+            confidence = count_l_k / count_lhs
+
+            # Keep going if the confidence level is too low. Every subset of
+            # lhs yields a rule with confidence at most this one, so nothing
+            # is lost
+            if confidence < min_conf:
+                continue
 
-        # Create the right hand set: rhs = (l_k - a_m) , and keep it sorted
-        rhs = set(l_k).difference(set(a_m))
-        rhs = tuple(sorted(rhs))
+            # Create the right hand set: rhs = (l_k - lhs). The itemset l_k is
+            # sorted, so filtering out the left hand side keeps it sorted
+            rhs = tuple(item for item in l_k if item not in lhs)
 
-        # Create new rule object and yield it
-        yield Rule(a_m, rhs, count(l_k), count(a_m), count(rhs), num_transactions)
+            # Create new rule object and yield it
+            yield Rule(lhs, rhs, count_l_k, count_lhs, itemsets_rhs[rhs], num_transactions)
 
-        # If the left hand side has one item only, do not recurse the function
-        if len(a_m) <= 1:
-            continue
-        yield from _genrules(l_k, a_m, itemsets, min_conf, num_transactions)
+            # If the left hand side has more than one item, search its subsets
+            if len(lhs) > 1:
+                stack.append((lhs, i))
 
 
 def generate_rules_apriori(
@@ -310,12 +303,6 @@ def generate_rules_apriori(
     if not ((num_transactions >= 0) and isinstance(num_transactions, numbers.Number)):
         raise ValueError("`num_transactions` must be a number greater than 0.")
 
-    def count(itemset):
-        """
-        Helper function to retrieve the count of the itemset in the dataset.
-        """
-        return itemsets[len(itemset)][itemset]
-
     if verbosity > 0:
         print("Generating rules from itemsets.")
 
@@ -328,26 +315,33 @@ def generate_rules_apriori(
         if verbosity > 0:
             print(" Generating rules of size {}.".format(size))
 
+        # The left hand sides below have length size - 1, and the right hand
+        # sides have length 1
+        itemsets_lhs = itemsets[size - 1]
+        itemsets_rhs = itemsets[1]
+
         # For every itemset of this size
-        for itemset in itemsets[size].keys():
+        for itemset, count_itemset in itemsets[size].items():
             # Generate combinations to start off of. These 1-combinations will
             # be merged to 2-combinations in the function `_ap_genrules`
             H_1 = []
             # Special case to capture rules such as {others} -> {1 item}
-            for removed in itertools.combinations(itemset, 1):
-                # Compute the left hand side
-                remaining = set(itemset).difference(set(removed))
-                lhs = tuple(sorted(remaining))
+            for i, item in enumerate(itemset):
+                # Compute the left hand side by slicing the removed item out
+                # of the itemset, which is sorted
+                removed = (item,)
+                lhs = itemset[:i] + itemset[i + 1 :]
 
                 # If the confidence is high enough, yield the rule
-                conf = count(itemset) / count(lhs)
+                count_lhs = itemsets_lhs[lhs]
+                conf = count_itemset / count_lhs
                 if conf >= min_confidence:
                     yield Rule(
                         lhs,
                         removed,
-                        count(itemset),
-                        count(lhs),
-                        count(removed),
+                        count_itemset,
+                        count_lhs,
+                        itemsets_rhs[removed],
                         num_transactions,
                     )
 
@@ -358,7 +352,7 @@ def generate_rules_apriori(
             if len(H_1) == 0:
                 continue
 
-            yield from _ap_genrules(itemset, H_1, itemsets, min_confidence, num_transactions)
+            yield from _ap_genrules(itemset, H_1, 1, itemsets, min_confidence, num_transactions)
 
     if verbosity > 0:
         print("Rule generation terminated.\n")
@@ -367,6 +361,7 @@ def generate_rules_apriori(
 def _ap_genrules(
     itemset: tuple,
     H_m: typing.List[tuple],
+    m: int,
     itemsets: typing.Dict[int, typing.Dict[tuple, int]],
     min_conf: float,
     num_transactions: int,
@@ -383,6 +378,8 @@ def _ap_genrules(
         The itemset under consideration.
     H_m : tuple
         Subsets of the itemset of length m, to be considered for rhs of a rule.
+    m : int
+        The length of every right hand side in H_m.
     itemsets : dict of dicts
         All itemsets and counts for in the data set.
     min_conf : float
@@ -391,44 +388,54 @@ def _ap_genrules(
         The number of transactions in the data set.
     """
 
-    def count(itemset):
-        """
-        Helper function to retrieve the count of the itemset in the dataset.
-        """
-        return itemsets[len(itemset)][itemset]
-
-    # If H_1 is so large that calling `apriori_gen` will produce right-hand
+    # If H_m is so large that calling `apriori_gen` will produce right-hand
     # sides as large as `itemset`, there will be no right hand side.
     # This should not happen happen, so we return.
-    if len(itemset) <= (len(H_m[0]) + 1):
+    if len(itemset) <= (m + 1):
         return
 
-    # Generate right-hand itemsets of length k + 1 if H is of length k
-    H_m = list(apriori_gen(H_m))
-    H_m_copy = H_m.copy()
-
-    # For every possible right hand side
-    for h_m in H_m:
-        # Compute the left hand side of the rule
-        lhs = tuple(sorted(set(itemset).difference(set(h_m))))
+    # A right hand side of length m + 1 is only generated if all of its m + 1
+    # subsets of length m are in H_m, so fewer than m + 1 of them produce none.
+    # This also covers an empty H_m
+    if len(H_m) <= m:
+        return
 
-        # If the confidence is high enough, yield the rule, else remove from
-        # the upcoming recursive generator call
-        if (count(itemset) / count(lhs)) >= min_conf:
+    # The right-hand sides of the rules yielded, to be considered in the
+    # upcoming recursive generator call
+    H_m_kept = []
+
+    # The count of the itemset is the same for every rule
+    count_itemset = itemsets[len(itemset)][itemset]
+
+    # The right hand sides generated below have length m + 1, and the left
+    # hand sides the remaining items of the itemset
+    itemsets_lhs = itemsets[len(itemset) - m - 1]
+    itemsets_rhs = itemsets[m + 1]
+
+    # For every possible right hand side, generating right-hand itemsets of
+    # length k + 1 if H is of length k
+    for h_m in apriori_gen(H_m):
+        # Compute the left hand side of the rule. The itemset is sorted, so
+        # filtering out the right hand side keeps it sorted
+        lhs = tuple(item for item in itemset if item not in h_m)
+
+        # If the confidence is high enough, yield the rule and keep the
+        # right-hand side for the upcoming recursive generator call
+        count_lhs = itemsets_lhs[lhs]
+        if (count_itemset / count_lhs) >= min_conf:
             yield Rule(
                 lhs,
                 h_m,
-                count(itemset),
-                count(lhs),
-                count(h_m),
+                count_itemset,
+                count_lhs,
+                itemsets_rhs[h_m],
                 num_transactions,
             )
-        else:
-            H_m_copy.remove(h_m)
+            H_m_kept.append(h_m)
 
-    # Unless the list of right-hand sides is empty, recurse the generator call
-    if H_m_copy:
-        yield from _ap_genrules(itemset, H_m_copy, itemsets, min_conf, num_transactions)
+    # Recurse the generator call, which returns at once if too few right-hand
+    # sides were kept
+    yield from _ap_genrules(itemset, H_m_kept, m + 1, itemsets, min_conf, num_transactions)
 
 
 if __name__ == "__main__":
@@ -22,6 +22,7 @@ def test_api():
     ]
 
     itemsets, rules = apriori(transactions, 0.2, 0.2)
+    transaction_sets = [frozenset(trans) for trans in transactions]
 
     assert itemsets[1] == {("a",): 3, ("c",): 4, ("e",): 4, ("d",): 3, ("b",): 4, ("f",): 3}
     assert all(isinstance(rule, Rule) for rule in rules)
@@ -29,7 +30,8 @@ def test_api():
     for count, itemsets_dict in itemsets.items():
         assert isinstance(itemsets_dict, dict)
         for itemset, count in itemsets_dict.items():
-            actual_count = sum(1 if set(itemset).issubset(set(trans)) else 0 for trans in transactions)
+            itemset_set = frozenset(itemset)
+            actual_count = sum(1 for trans in transaction_sets if itemset_set <= trans)
             assert count == actual_count
 
     itemsets, rules = apriori(transactions, 0.2, 0.2, output_transaction_ids=True)
@@ -38,7 +40,8 @@ def test_api():
         for itemset, counter in itemsets_dict.items():
             assert isinstance(counter, ItemsetCount)
 
-            actual_count = sum(1 if set(itemset).issubset(set(trans)) else 0 for trans in transactions)
+            itemset_set = frozenset(itemset)
+            actual_count = sum(1 for trans in transaction_sets if itemset_set <= trans)
             assert counter.itemset_count == actual_count
 
 
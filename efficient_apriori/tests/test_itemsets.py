@@ -8,7 +8,8 @@ import pytest
 import itertools
 import random
 
-from efficient_apriori.itemsets import itemsets_from_transactions, TransactionManager
+from efficient_apriori.itemsets import itemsets_from_transactions, TransactionManager, join_step
+from efficient_apriori.itemsets import _bits_from_indices, _indices_from_bits, _popcount, _popcount_fallback, _min_count
 
 
 def generate_transactions(num_transactions, unique_items, items_row=(1, 100), seed=None):
@@ -36,26 +37,27 @@ def itemsets_from_transactions_naive(transactions, min_support):
     unique_items = set(k for t in transactions for k in t)
     num_transactions = len(transactions)
 
+    # Convert the transactions to sets once, instead of for every combination
+    transaction_sets = [set(transaction) for transaction in transactions]
+
     # Create an output dictionary
     L = dict()
 
     # For every possible combination length
     for k in range(1, len(unique_items) + 1):
-        # For every possible combination
-        for combination in itertools.combinations(unique_items, k):
+        # For every possible combination, as sorted tuples of sorted items
+        for combination in itertools.combinations(sorted(unique_items), k):
             # Naively count how many transactions contain the combination
-            counts = 0
-            for transaction in transactions:
-                if set.issubset(set(combination), set(transaction)):
-                    counts += 1
+            combination_set = set(combination)
+            counts = sum(1 for transaction_set in transaction_sets if combination_set <= transaction_set)
 
             # If the count exceeds the minimum support, add it
             if (counts / num_transactions) >= min_support:
                 try:
-                    L[k][tuple(sorted(list(combination)))] = counts
+                    L[k][combination] = counts
                 except KeyError:
                     L[k] = dict()
-                    L[k][tuple(sorted(list(combination)))] = counts
+                    L[k][combination] = counts
 
         try:
             L[k] = {k: v for (k, v) in sorted(L[k].items())}
@@ -106,6 +108,69 @@ def test_itemsets_max_length(transactions, min_support):
     assert all(list(k <= max_len for k in result.keys()))
 
 
+@pytest.mark.parametrize("transactions, min_support", input_data[:50])
+def test_itemsets_from_generator(transactions, min_support):
+    """
+    Passing the transactions as a generator gives the same result as a list.
+    """
+    result = itemsets_from_transactions(list(transactions), min_support)
+    result_generator = itemsets_from_transactions((t for t in transactions), min_support)
+
+    assert result_generator == result
+
+
+@pytest.mark.parametrize("transactions, min_support", input_data[:50])
+def test_itemsets_are_sorted(transactions, min_support):
+    """
+    Itemsets of size 2 and above are returned in sorted order.
+    """
+    result, _ = itemsets_from_transactions(list(transactions), min_support)
+
+    for length, itemsets in result.items():
+        if length > 1:
+            assert list(itemsets.keys()) == sorted(itemsets.keys())
+
+
+@pytest.mark.parametrize("seed", list(range(25)))
+def test_join_step_yields_sorted_candidates(seed):
+    """
+    The join step yields sorted candidates, in sorted order.
+    """
+    random.seed(seed)
+    k = random.randint(1, 4)
+    itemsets = sorted(set(tuple(sorted(random.sample(range(8), k))) for _ in range(random.randint(1, 30))))
+
+    candidates = list(join_step(itemsets))
+    assert candidates == sorted(candidates)
+    assert all(list(candidate) == sorted(candidate) for candidate in candidates)
+
+
+@pytest.mark.parametrize("num_bits", [1, 7, 8, 9, 64, 100, 1000])
+@pytest.mark.parametrize("density", [0.0, 0.05, 0.5, 1.0])
+def test_bits_round_trip(num_bits, density):
+    """
+    Packing indices into a bitmask and unpacking them returns the indices.
+    """
+    random.seed(num_bits)
+    indices = set(random.sample(range(num_bits), k=int(num_bits * density)))
+    bits = _bits_from_indices(indices, num_bits)
+
+    assert _popcount(bits) == len(indices)
+    assert _popcount_fallback(bits) == len(indices)
+    assert _indices_from_bits(bits, list(range(num_bits))) == indices
+
+
+@pytest.mark.parametrize("num_transactions", [1, 3, 7, 10, 99, 1000])
+def test_min_count(num_transactions):
+    """
+    Comparing counts to the minimum count equals comparing supports.
+    """
+    for min_support in [i / 100 for i in range(101)] + [1 / 3, 2 / 3, 2 / 5]:
+        min_count = _min_count(min_support, num_transactions)
+        for count in range(num_transactions + 1):
+            assert (count >= min_count) == (count / num_transactions >= min_support)
+
+
 def test_transaction_manager():
     manager = TransactionManager([{0, 1}, {2, 3}, {3, 4}, {0, 2}])
     assert len(manager) == 4
@@ -116,6 +181,9 @@ def test_transaction_manager():
     assert manager.transaction_indices_sc({0}, 0.55) == (False, None)
     assert manager.transaction_indices_sc({0, 1}, 0.25) == (True, {0})
     assert manager.transaction_indices_sc({0, 1}, 0.26) == (False, None)
+    assert manager.transaction_bits_sc({0}, 0.5) == (True, 0b1001)
+    assert manager.transaction_bits_sc({2, 3}, 0.25) == (True, 0b0010)
+    assert manager.transaction_bits_sc({2, 3}, 0.26) == (False, None)
 
 
 if __name__ == "__main__":
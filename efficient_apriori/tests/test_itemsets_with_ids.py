@@ -36,27 +36,31 @@ def itemsets_from_transactions_naive(transactions, min_support):
     unique_items = {k for ts in transactions for k in ts}
     num_transactions = len(transactions)
 
+    # Convert the transactions to sets once, instead of for every combination
+    transaction_sets = [set(transaction) for transaction in transactions]
+
     # Create an output dictionary
     L = dict()
 
     # For every possible combination length
     for k in range(1, len(unique_items) + 1):
-        # For every possible combination
-        for combination in itertools.combinations(unique_items, k):
+        # For every possible combination, as sorted tuples of sorted items
+        for combination in itertools.combinations(sorted(unique_items), k):
             # Naively count how many transactions contain the combination
+            combination_set = set(combination)
             counts = ItemsetCount()
-            for i, t in enumerate(transactions):
-                if set.issubset(set(combination), set(t)):
+            for i, transaction_set in enumerate(transaction_sets):
+                if combination_set <= transaction_set:
                     counts.itemset_count += 1
                     counts.members.add(i)
 
             # If the count exceeds the minimum support, add it
             if (counts.itemset_count / num_transactions) >= min_support:
                 try:
-                    L[k][tuple(sorted(list(combination)))] = counts
+                    L[k][combination] = counts
                 except KeyError:
                     L[k] = dict()
-                    L[k][tuple(sorted(list(combination)))] = counts
+                    L[k][combination] = counts
 
         try:
             L[k] = {k: v for (k, v) in sorted(L[k].items())}
@@ -115,5 +119,17 @@ def test_itemsets_max_length(transactions, min_support):
             assert all(isinstance(i, int) for i in itemset_count.members)
 
 
+def test_itemsets_share_transaction_ids():
+    """
+    Test that equal transaction ids are the same int object in every itemset,
+    so that the output holds one int per transaction, not one per member.
+    """
+    transactions = list(generate_transactions(1000, 5, (1, 5), seed=42))
+    result, _ = itemsets_from_transactions(transactions, 0.05, output_transaction_ids=True)
+
+    members = [i for itemsets in result.values() for itemset_count in itemsets.values() for i in itemset_count.members]
+    assert len({id(i) for i in members}) == len(set(members))
+
+
 if __name__ == "__main__":
     pytest.main(args=[".", "--doctest-modules", "-v"])
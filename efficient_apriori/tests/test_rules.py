@@ -56,11 +56,8 @@ def generate_rules_naively(itemsets, min_confidence, num_transactions):
 def test_generate_rules_apriori_large():
     """
     Test with lots of data.
-    This test will fail if the second argument to `_ap_genrules` is not
-    validated as non-empty before the recursive function call. We must have
-    if H_m_copy:
-        yield from _ap_genrules
-    for this test to pass.
+    This test will fail if `_ap_genrules` does not return when its second
+    argument is empty, i.e. when no right hand sides were kept.
     """
 
     transactions = generate_transactions(num_transactions=100, unique_items=30, items_row=(1, 20), seed=123)
@@ -106,6 +103,18 @@ def test_generate_rules_simple_vs_naive(transactions):
     assert set(rules_naive) == set(rules_simple)
 
 
+@pytest.mark.parametrize("transactions", input_data)
+def test_generate_rules_simple_no_duplicates(transactions):
+    """
+    Test that the simple rule finder visits every rule once.
+    """
+
+    itemsets, num_transactions = itemsets_from_transactions(transactions, 0.1)
+
+    rules_simple = list(generate_rules_simple(itemsets, 0.1, num_transactions))
+    assert len(rules_simple) == len(set(rules_simple))
+
+
 @pytest.mark.parametrize("transactions", input_data)
 def test_generate_rules_simple_vs_apriori(transactions):
     """
@@ -141,6 +150,36 @@ def test_generate_rules_naive_vs_apriori(transactions):
     assert set(rules_apri) == set(rules_naive)
 
 
+def test_rule_pickle_round_trip():
+    """
+    Test that a rule, which has slots and no __dict__, survives pickling.
+    """
+    import pickle
+
+    rule = Rule(("a", "b"), ("c",), 50, 100, 150, 200)
+    assert not hasattr(rule, "__dict__")
+
+    unpickled = pickle.loads(pickle.dumps(rule))
+    assert unpickled == rule
+    assert str(unpickled) == str(rule)
+
+
+def test_rule_measures_with_zero_counts():
+    """
+    Test that measures which cannot be computed are None.
+    """
+    rule = Rule(("a",), ("b",), 5, 0, 3, 10)
+    assert rule.confidence is None
+    assert rule.support == 0.5
+    assert rule.lift is None
+    assert rule.conviction is None
+    assert rule.rpf is None
+
+    rule = Rule(("a",), ("b",))
+    assert rule.support is None
+    assert rule.rpf is None
+
+
 def speeds():
     """
     Test the naive rule finder vs. the simple one from the paper.